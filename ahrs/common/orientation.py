@@ -220,12 +220,12 @@ def q_prod(p: np.ndarray, q: np.ndarray) -> np.ndarray:
            https://www.mathworks.com/help/aeroblks/quaternionmultiplication.html
 
     """
-    pq = np.zeros(4)
-    pq[0] = p[0]*q[0] - p[1]*q[1] - p[2]*q[2] - p[3]*q[3]
-    pq[1] = p[0]*q[1] + p[1]*q[0] + p[2]*q[3] - p[3]*q[2]
-    pq[2] = p[0]*q[2] - p[1]*q[3] + p[2]*q[0] + p[3]*q[1]
-    pq[3] = p[0]*q[3] + p[1]*q[2] - p[2]*q[1] + p[3]*q[0]
-    return pq
+    pw, px, py, pz = np.asarray(p, dtype=float).tolist()
+    qw, qx, qy, qz = np.asarray(q, dtype=float).tolist()
+    return np.array([pw*qw - px*qx - py*qy - pz*qz,
+                     pw*qx + px*qw + py*qz - pz*qy,
+                     pw*qy - px*qz + py*qw + pz*qx,
+                     pw*qz + px*qy - py*qx + pz*qw])
 
 def q_mult_L(q: np.ndarray) -> np.ndarray:
     """Matrix form of a left-sided quaternion multiplication Q.
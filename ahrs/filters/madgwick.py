@@ -369,8 +369,175 @@ References
 
 """
 
+import math
 import numpy as np
-from ..common.orientation import q_prod, q_conj, acc2q, am2q
+from ..common.orientation import acc2q, am2q
+
+def _is_valid3(x: float, y: float, z: float) -> bool:
+    """Whether a tri-axial sample is finite and not null."""
+    return (x != 0.0 or y != 0.0 or z != 0.0) and math.isfinite(x) and math.isfinite(y) and math.isfinite(z)
+
+def _valid_samples(V: np.ndarray) -> np.ndarray:
+    """Boolean mask of the tri-axial samples (along the last axis) that are finite and not null."""
+    return np.isfinite(V).all(axis=-1) & (V != 0).any(axis=-1)
+
+def _unit3(x: float, y: float, z: float) -> tuple:
+    """Normalized tri-axial sample, or a null vector if the sample is not valid."""
+    s = x*x + y*y + z*z
+    if not _is_valid3(x, y, z) or not s > 0.0:
+        return 0.0, 0.0, 0.0
+    r = 1.0/math.sqrt(s)
+    return x*r, y*r, z*r
+
+def _rnorm4(w: float, x: float, y: float, z: float) -> float:
+    """Reciprocal of the norm of a 4D vector, or zero for a null or non-finite vector."""
+    s = w*w + x*x + y*y + z*z
+    return 1.0/math.sqrt(s) if s > 0.0 else 0.0
+
+def _imu_step(qw: float, qx: float, qy: float, qz: float,
+              gx: float, gy: float, gz: float,
+              ax: float, ay: float, az: float,
+              gain: float, dt: float) -> tuple:
+    """Single Madgwick step with IMU architecture using scalars only.
+
+    The accelerometer sample must be normalized beforehand. A null sample
+    skips the gradient descent correction.
+    """
+    # Rate of change from angular velocity (eq. 12)
+    dw = 0.5*(-qx*gx - qy*gy - qz*gz)
+    dx = 0.5*( qw*gx + qy*gz - qz*gy)
+    dy = 0.5*( qw*gy - qx*gz + qz*gx)
+    dz = 0.5*( qw*gz + qx*gy - qy*gx)
+    if ax != 0.0 or ay != 0.0 or az != 0.0:
+        q_inv = _rnorm4(qw, qx, qy, qz)
+        nw, nx, ny, nz = qw*q_inv, qx*q_inv, qy*q_inv, qz*q_inv
+        # Scaled components shared by the objective function and Jacobian
+        two_nw, two_nx, two_ny, two_nz = 2.0*nw, 2.0*nx, 2.0*ny, 2.0*nz
+        four_nx, four_ny = 4.0*nx, 4.0*ny
+        # Objective function (eq. 25)
+        f0 = two_nx*nz - two_nw*ny       - ax
+        f1 = two_nw*nx + two_ny*nz       - ay
+        f2 = 1.0 - two_nx*nx - two_ny*ny - az
+        # Objective function gradient J.T@f (eq. 34) with the Jacobian of
+        # (eq. 26) written out. Its null entries are omitted.
+        s0 = -two_ny*f0 + two_nx*f1
+        s1 =  two_nz*f0 + two_nw*f1 - four_nx*f2
+        s2 = -two_nw*f0 + two_nz*f1 - four_ny*f2
+        s3 =  two_nx*f0 + two_ny*f1
+        k = gain*_rnorm4(s0, s1, s2, s3)
+        dw -= k*s0                                                  # (eq. 33)
+        dx -= k*s1
+        dy -= k*s2
+        dz -= k*s3
+    qw += dw*dt                                                     # (eq. 13)
+    qx += dx*dt
+    qy += dy*dt
+    qz += dz*dt
+    q_inv = _rnorm4(qw, qx, qy, qz)
+    return qw*q_inv, qx*q_inv, qy*q_inv, qz*q_inv
+
+def _marg_step(qw: float, qx: float, qy: float, qz: float,
+               gx: float, gy: float, gz: float,
+               ax: float, ay: float, az: float,
+               mx: float, my: float, mz: float,
+               gain: float, dt: float) -> tuple:
+    """Single Madgwick step with MARG architecture using scalars only.
+
+    The accelerometer and magnetometer samples must be normalized
+    beforehand. A null accelerometer sample skips the gradient descent
+    correction.
+    """
+    # Rate of change from angular velocity (eq. 12)
+    dw = 0.5*(-qx*gx - qy*gy - qz*gz)
+    dx = 0.5*( qw*gx + qy*gz - qz*gy)
+    dy = 0.5*( qw*gy - qx*gz + qz*gx)
+    dz = 0.5*( qw*gz + qx*gy - qy*gx)
+    if ax != 0.0 or ay != 0.0 or az != 0.0:
+        # Rotate magnetometer measurements as q*[0, m]*q' (eq. 45)
+        tw = mx*qx + my*qy + mz*qz
+        tx = mx*qw - my*qz + mz*qy
+        ty = mx*qz + my*qw - mz*qx
+        tz = my*qx - mx*qy + mz*qw
+        hx = qw*tx + qx*tw + qy*tz - qz*ty
+        hy = qw*ty - qx*tz + qy*tw + qz*tx
+        hz = qw*tz + qx*ty - qy*tx + qz*tw
+        bx = math.sqrt(hx*hx + hy*hy)                               # (eq. 46)
+        bz = hz
+        q_inv = _rnorm4(qw, qx, qy, qz)
+        nw, nx, ny, nz = qw*q_inv, qx*q_inv, qy*q_inv, qz*q_inv
+        # Scaled components shared by the objective function and Jacobian
+        two_nw, two_nx, two_ny, two_nz = 2.0*nw, 2.0*nx, 2.0*ny, 2.0*nz
+        four_nx, four_ny = 4.0*nx, 4.0*ny
+        # Rotated directions, common to the gravity and magnetic terms
+        r0 = two_nx*nz - two_nw*ny
+        r1 = two_nw*nx + two_ny*nz
+        r2 = 1.0 - two_nx*nx - two_ny*ny
+        # Reference magnetic field scaled by the doubled components, shared
+        # by the magnetic rows of the objective function and its Jacobian
+        bxw, bxx, bxy, bxz = bx*two_nw, bx*two_nx, bx*two_ny, bx*two_nz
+        bzw, bzx, bzy, bzz = bz*two_nw, bz*two_nx, bz*two_ny, bz*two_nz
+        # Objective function (eq. 31)
+        f0 = r0 - ax
+        f1 = r1 - ay
+        f2 = r2 - az
+        f3 = bx - bxy*ny - bxz*nz + bz*r0 - mx
+        f4 = bxx*ny - bxw*nz      + bz*r1 - my
+        f5 = bxw*ny + bxx*nz      + bz*r2 - mz
+        # Objective function gradient J.T@f (eq. 34) with the Jacobian of
+        # (eq. 32) written out. Its null entries are omitted.
+        s0 = -two_ny*f0 + two_nx*f1                - bzy*f3             + (bzx - bxz)*f4 + bxy*f5
+        s1 =  two_nz*f0 + two_nw*f1 - four_nx*f2   + bzz*f3             + (bxy + bzw)*f4 + (bxz - 2.0*bzx)*f5
+        s2 = -two_nw*f0 + two_nz*f1 - four_ny*f2   - (2.0*bxy + bzw)*f3 + (bxx + bzz)*f4 + (bxw - 2.0*bzy)*f5
+        s3 =  two_nx*f0 + two_ny*f1                + (bzx - 2.0*bxz)*f3 + (bzy - bxw)*f4 + bxx*f5
+        k = gain*_rnorm4(s0, s1, s2, s3)
+        dw -= k*s0                                                  # (eq. 33)
+        dx -= k*s1
+        dy -= k*s2
+        dz -= k*s3
+    qw += dw*dt                                                     # (eq. 13)
+    qx += dx*dt
+    qy += dy*dt
+    qz += dz*dt
+    q_inv = _rnorm4(qw, qx, qy, qz)
+    return qw*q_inv, qx*q_inv, qy*q_inv, qz*q_inv
+
+def _imu_step_array(Q: np.ndarray, g: np.ndarray, a: np.ndarray, gain: np.ndarray, dt: float) -> np.ndarray:
+    """Madgwick step with IMU architecture over independent quaternions.
+
+    Same as ``_imu_step``, but applied at once to M-by-4 quaternions ``Q``,
+    M-by-3 gyroscope samples ``g`` and M-by-3 normalized accelerometer
+    samples ``a``, each row belonging to a different trajectory. Rows with
+    a null or non-finite gyroscope sample are left unchanged.
+    """
+    qw, qx, qy, qz = Q.T
+    gx, gy, gz = g.T
+    ax, ay, az = a.T
+    # Rate of change from angular velocity (eq. 12)
+    dw = 0.5*(-qx*gx - qy*gy - qz*gz)
+    dx = 0.5*( qw*gx + qy*gz - qz*gy)
+    dy = 0.5*( qw*gy - qx*gz + qz*gx)
+    dz = 0.5*( qw*gz + qx*gy - qy*gx)
+    # Scaled components shared by the objective function and Jacobian
+    two_qw, two_qx, two_qy, two_qz = 2.0*qw, 2.0*qx, 2.0*qy, 2.0*qz
+    four_qx, four_qy = 4.0*qx, 4.0*qy
+    # Objective function (eq. 25) with unit quaternions
+    f0 = two_qx*qz - two_qw*qy       - ax
+    f1 = two_qw*qx + two_qy*qz       - ay
+    f2 = 1.0 - two_qx*qx - two_qy*qy - az
+    # Objective function gradient J.T@f (eq. 34)
+    s0 = -two_qy*f0 + two_qx*f1
+    s1 =  two_qz*f0 + two_qw*f1 - four_qx*f2
+    s2 = -two_qw*f0 + two_qz*f1 - four_qy*f2
+    s3 =  two_qx*f0 + two_qy*f1
+    s_norm = np.sqrt(s0*s0 + s1*s1 + s2*s2 + s3*s3)
+    valid_acc = (s_norm > 0) & _valid_samples(a)
+    k = np.divide(gain, s_norm, out=np.zeros_like(s_norm), where=valid_acc)
+    Q_new = np.column_stack((qw + (dw - k*s0)*dt,                  # (eq. 33) and (eq. 13)
+                             qx + (dx - k*s1)*dt,
+                             qy + (dy - k*s2)*dt,
+                             qz + (dz - k*s3)*dt))
+    Q_new *= (1.0/np.sqrt(np.einsum('ij,ij->i', Q_new, Q_new)))[:, None]
+    return np.where(_valid_samples(g)[:, None], Q_new, Q)
 
 class Madgwick:
     """Madgwick's Gradient Descent Orientation Filter
@@ -478,8 +645,7 @@ class Madgwick:
     >>> Q = np.zeros((num_samples, 4))      # Allocation of quaternions
     >>> Q[0] = [1.0, 0.0, 0.0, 0.0]         # Initial attitude as a quaternion
     >>> for t in range(1, num_samples):
-    >>>     madgwick.Dt = new_sample_rate
-    ...     Q[t] = madgwick.updateIMU(Q[t-1], gyr=gyro_data[t], acc=acc_data[t])
+    ...     Q[t] = madgwick.updateIMU(Q[t-1], gyr=gyro_data[t], acc=acc_data[t], dt=new_sample_rate)
 
     Madgwick's algorithm uses a gradient descent method to correct the
     estimation of the attitude. The **step size**, a.k.a.
@@ -520,23 +686,21 @@ class Madgwick:
         """
         if self.acc.shape != self.gyr.shape:
             raise ValueError("acc and gyr are not the same size")
-        num_samples = len(self.acc)
-        Q = np.zeros((num_samples, 4))
         # Compute with IMU architecture
         if self.mag is None:
-            Q[0] = acc2q(self.acc[0]) if self.q0 is None else self.q0/np.linalg.norm(self.q0)
-            for t in range(1, num_samples):
-                Q[t] = self.updateIMU(Q[t-1], self.gyr[t], self.acc[t])
-            return Q
+            return self.updateIMU_batch(self.gyr, self.acc, self.q0)
         # Compute with MARG architecture
         if self.mag.shape != self.gyr.shape:
             raise ValueError("mag and gyr are not the same size")
+        num_samples = len(self.acc)
+        Q = np.zeros((num_samples, 4))
         Q[0] = am2q(self.acc[0], self.mag[0]) if self.q0 is None else self.q0/np.linalg.norm(self.q0)
+        update, gyr, acc, mag = self.updateMARG, self.gyr, self.acc, self.mag
         for t in range(1, num_samples):
-            Q[t] = self.updateMARG(Q[t-1], self.gyr[t], self.acc[t], self.mag[t])
+            Q[t] = update(Q[t-1], gyr[t], acc[t], mag[t])
         return Q
 
-    def updateIMU(self, q: np.ndarray, gyr: np.ndarray, acc: np.ndarray) -> np.ndarray:
+    def updateIMU(self, q: np.ndarray, gyr: np.ndarray, acc: np.ndarray, dt: float = None) -> np.ndarray:
         """
         Quaternion Estimation with IMU architecture.
 
@@ -548,6 +712,9 @@ class Madgwick:
             Sample of tri-axial Gyroscope in rad/s
         acc : numpy.ndarray
             Sample of tri-axial Accelerometer in m/s^2
+        dt : float, default: None
+            Time step, in seconds, since the previous sample. Defaults to the
+            attribute ``Dt``.
 
         Returns
         -------
@@ -579,29 +746,227 @@ class Madgwick:
         stored as quaternions.
 
         """
-        if gyr is None or not np.linalg.norm(gyr)>0:
-            return q
-        qDot = 0.5 * q_prod(q, [0, *gyr])                           # (eq. 12)
-        a_norm = np.linalg.norm(acc)
-        if a_norm>0:
-            a = acc/a_norm
-            qw, qx, qy, qz = q/np.linalg.norm(q)
-            # Gradient objective function (eq. 25) and Jacobian (eq. 26)
-            f = np.array([2.0*(qx*qz - qw*qy)   - a[0],
-                          2.0*(qw*qx + qy*qz)   - a[1],
-                          2.0*(0.5-qx**2-qy**2) - a[2]])            # (eq. 25)
-            J = np.array([[-2.0*qy,  2.0*qz, -2.0*qw, 2.0*qx],
-                          [ 2.0*qx,  2.0*qw,  2.0*qz, 2.0*qy],
-                          [ 0.0,    -4.0*qx, -4.0*qy, 0.0   ]])     # (eq. 26)
-            # Objective Function Gradient
-            gradient = J.T@f                                        # (eq. 34)
-            gradient /= np.linalg.norm(gradient)
-            qDot -= self.gain*gradient                              # (eq. 33)
-        q += qDot*self.Dt                                           # (eq. 13)
-        q /= np.linalg.norm(q)
-        return q
-
-    def updateMARG(self, q: np.ndarray, gyr: np.ndarray, acc: np.ndarray, mag: np.ndarray) -> np.ndarray:
+        if gyr is None:
+            return np.array(q, dtype=float)
+        # Unpack as Python floats. Inputs are never modified.
+        qw, qx, qy, qz = np.asarray(q, dtype=float).tolist()
+        gx, gy, gz = np.asarray(gyr, dtype=float).tolist()
+        if not _is_valid3(gx, gy, gz):
+            return np.array([qw, qx, qy, qz])
+        ax, ay, az = _unit3(*np.asarray(acc, dtype=float).tolist())
+        return np.array(_imu_step(qw, qx, qy, qz, gx, gy, gz, ax, ay, az,
+                                   self.gain, self.Dt if dt is None else dt))
+
+    def prepare(self, num_samples: int, q0: np.ndarray = None) -> np.ndarray:
+        """
+        Allocate the estimated quaternions of a stream of samples.
+
+        The attribute ``Q`` is set to an array able to hold ``num_samples``
+        quaternions, which are then estimated one at a time with
+        ``stepIMU``. Any previous value of ``Q``, such as the estimation
+        computed at construction, is replaced.
+
+        Parameters
+        ----------
+        num_samples : int
+            Number of samples in the stream.
+        q0 : numpy.ndarray, default: None
+            Initial orientation. Defaults to the identity quaternion.
+
+        Returns
+        -------
+        Q : numpy.ndarray
+            N-by-4 array with the initial orientation in its first row.
+
+        """
+        self.Q = np.zeros((num_samples, 4))
+        self.Q[0] = [1.0, 0.0, 0.0, 0.0] if q0 is None else q0/np.linalg.norm(q0)
+        return self.Q
+
+    def stepIMU(self, t: int, gyr: np.ndarray, acc: np.ndarray, dt: float = None) -> np.ndarray:
+        """
+        Quaternion Estimation of a stream sample with IMU architecture.
+
+        Same as ``updateIMU``, but the a-priori quaternion is read from the
+        row ``t-1`` of the attribute ``Q`` allocated with ``prepare``, and the
+        estimation is written in its row ``t``, without allocating any
+        intermediate array.
+
+        Parameters
+        ----------
+        t : int
+            Index of the sample, from 1 to the number of allocated samples
+            minus one.
+        gyr : numpy.ndarray
+            Sample of tri-axial Gyroscope in rad/s
+        acc : numpy.ndarray
+            Sample of tri-axial Accelerometer in m/s^2
+        dt : float, default: None
+            Time step, in seconds, since the previous sample. Defaults to the
+            attribute ``Dt``.
+
+        Returns
+        -------
+        q : numpy.ndarray
+            Estimated quaternion, as a view of the row ``t`` of ``Q``.
+
+        Examples
+        --------
+        >>> from ahrs.filters import Madgwick
+        >>> madgwick = Madgwick()
+        >>> Q = madgwick.prepare(num_samples)
+        >>> for t in range(1, num_samples):
+        ...   madgwick.stepIMU(t, gyro_data[t], acc_data[t])
+        ...
+
+        """
+        Q = getattr(self, 'Q', None)
+        if Q is None:
+            raise ValueError("call prepare() before stepIMU()")
+        if not 1 <= t < len(Q):
+            raise ValueError(f"Sample index must be between 1 and {len(Q)-1}. Got {t}")
+        qw, qx, qy, qz = Q[t-1].tolist()
+        gx, gy, gz = np.asarray(gyr, dtype=float).tolist()
+        if _is_valid3(gx, gy, gz):
+            ax, ay, az = _unit3(*np.asarray(acc, dtype=float).tolist())
+            qw, qx, qy, qz = _imu_step(qw, qx, qy, qz, gx, gy, gz, ax, ay, az,
+                                       self.gain, self.Dt if dt is None else dt)
+        Q[t] = qw, qx, qy, qz
+        return Q[t]
+
+    def updateIMU_batch(self, gyr: np.ndarray, acc: np.ndarray, q0: np.ndarray = None) -> np.ndarray:
+        """
+        Quaternion Estimation of a full time series with IMU architecture.
+
+        Equivalent to calling ``updateIMU`` once per sample, but the
+        normalization of the accelerometer samples and the validation of the
+        gyroscope samples are done for all samples at once, and the recursive
+        integration only uses scalar arithmetic, avoiding the construction of
+        intermediate arrays at every step.
+
+        Parameters
+        ----------
+        gyr : numpy.ndarray
+            N-by-3 array with samples of tri-axial Gyroscope in rad/s
+        acc : numpy.ndarray
+            N-by-3 array with samples of tri-axial Accelerometer in m/s^2
+        q0 : numpy.ndarray, default: None
+            Initial orientation. If not given, it is estimated from the first
+            accelerometer sample.
+
+        .. note::
+            Samples can be given in any floating point type (e.g. single
+            precision arrays of :class:`ahrs.utils.io.Data`), but the
+            estimation is always carried out, and returned, in double
+            precision.
+
+        Returns
+        -------
+        Q : numpy.ndarray
+            N-by-4 array with all estimated quaternions.
+
+        Examples
+        --------
+        >>> from ahrs.filters import Madgwick
+        >>> madgwick = Madgwick()
+        >>> Q = madgwick.updateIMU_batch(gyro_data, acc_data)
+        >>> Q.shape
+        (1000, 4)
+
+        """
+        gyr = np.asarray(gyr, dtype=float)
+        acc = np.asarray(acc, dtype=float)
+        if acc.shape != gyr.shape:
+            raise ValueError("acc and gyr are not the same size")
+        num_samples = len(acc)
+        Q = np.zeros((num_samples, 4))
+        Q[0] = acc2q(acc[0]) if q0 is None else q0/np.linalg.norm(q0)
+        # Normalize all accelerometer samples at once. Invalid samples are
+        # set to zero, which skips the gradient descent correction.
+        a_norm = np.sqrt(np.einsum('ij,ij->i', acc, acc))
+        valid_acc = _valid_samples(acc) & (a_norm > 0)
+        A = np.divide(acc, a_norm[:, None], out=np.zeros_like(acc), where=valid_acc[:, None])
+        valid_gyr = _valid_samples(gyr).tolist()
+        # The kernel is fed with Python floats, which are cheaper to operate
+        # on than NumPy scalars.
+        G, A = gyr.tolist(), A.tolist()
+        gain, dt = self.gain, self.Dt
+        qw, qx, qy, qz = Q[0].tolist()
+        step = _imu_step        # Local name avoids a global lookup per sample
+        for t in range(1, num_samples):
+            if valid_gyr[t]:
+                qw, qx, qy, qz = step(qw, qx, qy, qz, *G[t], *A[t], gain, dt)
+            Q[t] = qw, qx, qy, qz
+        return Q
+
+    def sweep(self, gyr: np.ndarray, acc: np.ndarray, q0: np.ndarray = None, gain: np.ndarray = None) -> np.ndarray:
+        """
+        Quaternion Estimation of several independent trajectories with IMU
+        architecture.
+
+        All trajectories are integrated simultaneously, advancing one sample
+        at a time, with each operation applied to all trajectories at once.
+        This is useful to process many recordings of equal length, or to
+        compare several gains over the same recording.
+
+        Parameters
+        ----------
+        gyr : numpy.ndarray
+            M-by-N-by-3 array with N samples of tri-axial Gyroscope, in
+            rad/s, of each of the M trajectories.
+        acc : numpy.ndarray
+            M-by-N-by-3 array with N samples of tri-axial Accelerometer, in
+            m/s^2, of each of the M trajectories.
+        q0 : numpy.ndarray, default: None
+            M-by-4 array with the initial orientation of each trajectory. If
+            not given, they are estimated from the first accelerometer
+            samples.
+        gain : float or numpy.ndarray, default: None
+            Filter gain of every trajectory, or M-element array with a gain
+            per trajectory. Defaults to the gain of the instance.
+
+        Returns
+        -------
+        Q : numpy.ndarray
+            M-by-N-by-4 array with all estimated quaternions.
+
+        Examples
+        --------
+        Estimate the attitude of the same recording with three different
+        gains:
+
+        >>> from ahrs.filters import Madgwick
+        >>> madgwick = Madgwick()
+        >>> gains = [0.01, 0.033, 0.1]
+        >>> Q = madgwick.sweep(np.tile(gyro_data, (3, 1, 1)), np.tile(acc_data, (3, 1, 1)), gain=gains)
+        >>> Q.shape
+        (3, 1000, 4)
+
+        """
+        gyr = np.asarray(gyr, dtype=float)
+        acc = np.asarray(acc, dtype=float)
+        if acc.shape != gyr.shape:
+            raise ValueError("acc and gyr are not the same size")
+        if gyr.ndim != 3 or gyr.shape[2] != 3:
+            raise ValueError("gyr and acc must be M-by-N-by-3 arrays")
+        num_trajectories, num_samples = gyr.shape[:2]
+        gain = np.broadcast_to(np.asarray(self.gain if gain is None else gain, dtype=float), (num_trajectories,))
+        Q = np.zeros((num_trajectories, num_samples, 4))
+        if q0 is None:
+            Q[:, 0] = [acc2q(a) for a in acc[:, 0]]
+        else:
+            q0 = np.broadcast_to(np.asarray(q0, dtype=float), (num_trajectories, 4))
+            Q[:, 0] = q0/np.linalg.norm(q0, axis=1)[:, None]
+        # Normalize all accelerometer samples at once
+        a_norm = np.linalg.norm(acc, axis=2)
+        valid_acc = _valid_samples(acc) & (a_norm > 0)
+        A = np.divide(acc, a_norm[..., None], out=np.zeros_like(acc, dtype=float), where=valid_acc[..., None])
+        step, dt = _imu_step_array, self.Dt
+        for t in range(1, num_samples):
+            Q[:, t] = step(Q[:, t-1], gyr[:, t], A[:, t], gain, dt)
+        return Q
+
+    def updateMARG(self, q: np.ndarray, gyr: np.ndarray, acc: np.ndarray, mag: np.ndarray, dt: float = None) -> np.ndarray:
         """
         Quaternion Estimation with a MARG architecture.
 
@@ -615,6 +980,9 @@ class Madgwick:
             Sample of tri-axial Accelerometer in m/s^2
         mag : numpy.ndarray
             Sample of tri-axial Magnetometer in nT
+        dt : float, default: None
+            Time step, in seconds, since the previous sample. Defaults to the
+            attribute ``Dt``.
 
         Returns
         -------
@@ -647,36 +1015,18 @@ class Madgwick:
         stored as quaternions.
 
         """
-        if gyr is None or not np.linalg.norm(gyr)>0:
-            return q
-        if mag is None or not np.linalg.norm(mag)>0:
-            return self.updateIMU(q, gyr, acc)
-        qDot = 0.5 * q_prod(q, [0, *gyr])                           # (eq. 12)
-        a_norm = np.linalg.norm(acc)
-        if a_norm>0:
-            a = acc/a_norm
-            m = mag/np.linalg.norm(mag)
-            # Rotate normalized magnetometer measurements
-            h = q_prod(q, q_prod([0, *m], q_conj(q)))               # (eq. 45)
-            bx = np.linalg.norm([h[1], h[2]])                       # (eq. 46)
-            bz = h[3]
-            qw, qx, qy, qz = q/np.linalg.norm(q)
-            # Gradient objective function (eq. 31) and Jacobian (eq. 32)
-            f = np.array([2.0*(qx*qz - qw*qy)   - a[0],
-                          2.0*(qw*qx + qy*qz)   - a[1],
-                          2.0*(0.5-qx**2-qy**2) - a[2],
-                          2.0*bx*(0.5 - qy**2 - qz**2) + 2.0*bz*(qx*qz - qw*qy)       - m[0],
-                          2.0*bx*(qx*qy - qw*qz)       + 2.0*bz*(qw*qx + qy*qz)       - m[1],
-                          2.0*bx*(qw*qy + qx*qz)       + 2.0*bz*(0.5 - qx**2 - qy**2) - m[2]])  # (eq. 31)
-            J = np.array([[-2.0*qy,               2.0*qz,              -2.0*qw,               2.0*qx             ],
-                          [ 2.0*qx,               2.0*qw,               2.0*qz,               2.0*qy             ],
-                          [ 0.0,                 -4.0*qx,              -4.0*qy,               0.0                ],
-                          [-2.0*bz*qy,            2.0*bz*qz,           -4.0*bx*qy-2.0*bz*qw, -4.0*bx*qz+2.0*bz*qx],
-                          [-2.0*bx*qz+2.0*bz*qx,  2.0*bx*qy+2.0*bz*qw,  2.0*bx*qx+2.0*bz*qz, -2.0*bx*qw+2.0*bz*qy],
-                          [ 2.0*bx*qy,            2.0*bx*qz-4.0*bz*qx,  2.0*bx*qw-4.0*bz*qy,  2.0*bx*qx          ]]) # (eq. 32)
-            gradient = J.T@f                                        # (eq. 34)
-            gradient /= np.linalg.norm(gradient)
-            qDot -= self.gain*gradient                              # (eq. 33)
-        q += qDot*self.Dt                                           # (eq. 13)
-        q /= np.linalg.norm(q)
-        return q
+        if gyr is None:
+            return np.array(q, dtype=float)
+        if mag is None:
+            return self.updateIMU(q, gyr, acc, dt)
+        # Unpack as Python floats. Inputs are never modified.
+        qw, qx, qy, qz = np.asarray(q, dtype=float).tolist()
+        gx, gy, gz = np.asarray(gyr, dtype=float).tolist()
+        if not _is_valid3(gx, gy, gz):
+            return np.array([qw, qx, qy, qz])
+        mx, my, mz = _unit3(*np.asarray(mag, dtype=float).tolist())
+        if not _is_valid3(mx, my, mz):
+            return self.updateIMU(q, gyr, acc, dt)
+        ax, ay, az = _unit3(*np.asarray(acc, dtype=float).tolist())
+        return np.array(_marg_step(qw, qx, qy, qz, gx, gy, gz, ax, ay, az, mx, my, mz,
+                                   self.gain, self.Dt if dt is None else dt))
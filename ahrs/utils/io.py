@@ -13,6 +13,7 @@ Input and Output routines
 
 import os
 import sys
+import tempfile
 import scipy.io as sio
 import numpy as np
 
@@ -60,10 +61,104 @@ def get_freq(times, units='s'):
     return 1.0 / mean
 
 def find_index(header, s):
-    for h in header:
-        if s in h.lower():
-            return header.index(h)
-    return None
+    """Index of the first item of a lowercase header containing ``s``."""
+    return next((i for i, h in enumerate(header) if s in h), None)
+
+def list_files(path, extension='.txt'):
+    """
+    Names of the files in a directory with the given extension.
+
+    Parameters
+    ----------
+    path : str or path-like
+        Path of the directory.
+    extension : str, default: '.txt'
+        Extension of the listed files.
+
+    Returns
+    -------
+    files : set
+        Names of the matching files. Subdirectories are ignored.
+
+    """
+    with os.scandir(path) as entries:
+        return {e.name for e in entries if e.name.endswith(extension) and e.is_file()}
+
+def load_cached(file_name, delimiter=' '):
+    """
+    Load timestamped numerical data of a text file through a binary cache.
+
+    The first column of the file is taken as timestamps, which are kept in
+    double precision, while the remaining columns are stored in single
+    precision, like the sensor arrays of :class:`Data`.
+
+    The first time a file is read, its parsed contents are stored in two
+    NPY files next to it: ``<name>_time.npy`` and ``<name>.npy``. Later calls
+    memory-map the caches instead of parsing the text again, as long as
+    they are not older than the text file.
+
+    Parameters
+    ----------
+    file_name : str
+        Name of the text file.
+    delimiter : str, default: ' '
+        String used to separate values.
+
+    Returns
+    -------
+    times : numpy.ndarray
+        Timestamps in the first column of the file, as float64.
+    values : numpy.ndarray
+        Remaining columns of the file, as float32.
+    """
+    base_name = os.path.splitext(file_name)[0]
+    cache_names = (base_name + '_time.npy', base_name + '.npy')
+    text_time = os.path.getmtime(file_name)
+    if all(os.path.isfile(c) and os.path.getmtime(c) >= text_time for c in cache_names):
+        try:
+            return tuple(np.load(c, mmap_mode='r') for c in cache_names)
+        except (OSError, ValueError):
+            pass    # Unreadable or truncated cache. Parse the text file again.
+    data = np.loadtxt(file_name, delimiter=delimiter, ndmin=2)
+    times = data[:, 0].copy()
+    values = data[:, 1:].astype(np.float32)
+    try:
+        for cache_name, array in zip(cache_names, (times, values)):
+            save_atomic(cache_name, array)
+    except OSError:
+        pass    # Read-only location or full disk. Parse the text again next time.
+    return times, values
+
+def save_atomic(file_name, data):
+    """
+    Save an array in a NPY file, which only appears once completely written.
+
+    The array is written to a temporary file in the same directory, which
+    then replaces the destination. The file gets the same permissions as
+    any file created by ``open``. If writing fails, the temporary file is
+    removed and the destination is left untouched.
+
+    Parameters
+    ----------
+    file_name : str
+        Name of the NPY file.
+    data : numpy.ndarray
+        Array to save.
+    """
+    fd, temp_name = tempfile.mkstemp(suffix='.npy', dir=os.path.dirname(os.path.abspath(file_name)))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.save(f, data)
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(temp_name, 0o666 & ~umask)   # mkstemp creates owner-only files
+        os.replace(temp_name, file_name)
+    except BaseException:
+        try:
+            os.remove(temp_name)
+        except OSError:
+            pass
+        raise
 
 def load(file_name, separator=';'):
     """
@@ -76,7 +171,7 @@ def load(file_name, separator=';'):
 
     Parameters
     ----------
-    file_name : str
+    file_name : str or os.PathLike
         Name of the file
     separator : str, default: ';'
         String used to split values. Normally using a single character. Default
@@ -88,6 +183,7 @@ def load(file_name, separator=';'):
         Read information stored in class Data.
     """
     raise DeprecationWarning("This function will be removed. Actually I don't know how you got to use it.")
+    file_name = os.fspath(file_name)
     if not os.path.isfile(file_name):
         sys.exit("[ERROR] The file {} does not exist.".format(file_name))
     file_ext = file_name.strip().split('.')[-1]
@@ -97,13 +193,13 @@ def load(file_name, separator=';'):
         return Data(d)
     if file_ext == 'csv':
         with open(file_name, 'r') as f:
-            all_lines = f.readlines()
-        split_header = all_lines[0].strip().split(separator)
+            split_header = next(f).strip().lower().split(separator)
+            next(f)     # Skip line with labels of axes
+            data = np.loadtxt(f, delimiter=separator)
         a_idx = find_index(split_header, 'acc')
         g_idx = find_index(split_header, 'gyr')
         m_idx = find_index(split_header, 'mag')
         q_idx = find_index(split_header, 'orient')
-        data = np.genfromtxt(all_lines[2:], delimiter=separator)
         d = {'time' : data[:, 0],
         'acc' : data[:, a_idx:a_idx+3],
         'gyr' : data[:, g_idx:g_idx+3],
@@ -139,28 +235,23 @@ def load_ETH_EC(path):
 
     """
     raise DeprecationWarning("This function will be removed. Actually I don't know how you got to use it.")
-    if not os.path.isdir(path):
+    try:
+        files = list_files(path)
+    except OSError:
         print("Invalid path")
         return None
     data = {}
-    files = []
-    [files.append(f) for f in os.listdir(path) if f.endswith('.txt')]
-    missing = list(set(files).symmetric_difference([
-        'events.txt',
-        'images.txt',
-        'imu.txt',
-        'groundtruth.txt',
-        'calib.txt']))
+    missing = {'events.txt', 'images.txt', 'imu.txt', 'groundtruth.txt', 'calib.txt'} - files
     if missing:
-        sys.exit("Incomplete data. Missing files:\n{}".format('\n'.join(missing)))
-    imu_data = np.loadtxt(os.path.join(path, 'imu.txt'), delimiter=' ')
-    data.update({"time_sensors": imu_data[:, 0]})
-    data.update({"accs": imu_data[:, 1:4]})
-    data.update({"gyros": imu_data[:, 4:7]})
+        sys.exit("Incomplete data. Missing files:\n{}".format('\n'.join(sorted(missing))))
+    imu_time, imu_data = load_cached(os.path.join(path, 'imu.txt'))
+    data.update({"time_sensors": imu_time})
+    data.update({"accs": imu_data[:, 0:3]})
+    data.update({"gyros": imu_data[:, 3:6]})
     data.update({"in_rads": False})
-    truth_data = np.loadtxt(os.path.join(path, 'groundtruth.txt'), delimiter=' ')
-    data.update({"time_truth": truth_data[:, 0]})
-    data.update({"qts": truth_data[:, 4:]})
+    truth_time, truth_data = load_cached(os.path.join(path, 'groundtruth.txt'))
+    data.update({"time_truth": truth_time})
+    data.update({"qts": truth_data[:, 3:]})
     return Data(data)
 
 def load_ETH_EuRoC(path):
@@ -324,14 +415,64 @@ def load_OxIOD(path, sequence=1):
     data.update({"q_ref": np.roll(vicon_data[:, 5:], 1, axis=1)}) # Roll data to fit standard quaternion notation
     return Data(data)
 
+def _sensor_property(name):
+    """
+    Attribute of a tri-axial sensor array.
+
+    Arrays are stored in single precision. When the owner is built with
+    ``soa=True``, N-by-3 arrays are stored as a single C-contiguous 3-by-N
+    array, whose rows are the contiguous columns of each axis. The attribute
+    returns its transposed view, so reading or writing it never copies the
+    data.
+    """
+    columns_key = '_' + name + '_columns'
+    def getter(self):
+        columns = self.__dict__.get(columns_key)
+        return self.__dict__.get(name) if columns is None else columns.T
+    def setter(self, value):
+        self.__dict__.pop(columns_key, None)
+        if isinstance(value, np.ndarray):
+            value = value.astype(np.float32, copy=False)
+        if self.soa and isinstance(value, np.ndarray) and value.ndim == 2 and value.shape[1] == 3:
+            self.__dict__[columns_key] = np.ascontiguousarray(value.T)
+            self.__dict__.pop(name, None)
+        else:
+            self.__dict__[name] = value
+    return property(getter, setter)
+
+def _axis_property(name, axis):
+    """Read-only view of a single axis of a tri-axial sensor array."""
+    def getter(self):
+        sensor = getattr(self, name)
+        return None if sensor is None else sensor[:, axis]
+    return property(getter)
+
 class Data:
-    """Data to store the arrays of the most common variables."""
+    """Data to store the arrays of the most common variables.
+
+    Sensor and reference orientation arrays are stored as single precision
+    floats, which is enough for the resolution of the sensors and halves
+    the memory used by them. The arrays ``acc``, ``gyr`` and ``mag`` are
+    converted whenever they are set, and the others at construction.
+    Timestamps keep their original precision.
+
+    If ``soa=True`` is given, the tri-axial arrays ``acc``, ``gyr`` and
+    ``mag`` are stored with each axis in contiguous memory, which is faster
+    to traverse one axis at a time. The N-by-3 arrays are still available,
+    as views, with their usual names, and each axis with the suffixes
+    ``_x``, ``_y`` and ``_z`` (e.g. ``acc_x``).
+    """
+    sensor_fields = ('acc', 'gyr', 'mag', 'q_ref', 'qts', 'accs', 'gyros')
+    soa = False
     time = None
-    acc = None
-    gyr = None
-    mag = None
+    acc = _sensor_property('acc')
+    gyr = _sensor_property('gyr')
+    mag = _sensor_property('mag')
+    acc_x, acc_y, acc_z = (_axis_property('acc', i) for i in range(3))
+    gyr_x, gyr_y, gyr_z = (_axis_property('gyr', i) for i in range(3))
+    mag_x, mag_y, mag_z = (_axis_property('mag', i) for i in range(3))
     q_ref = None
-    def __init__(self, *initial_data, **kwargs):
+    def __init__(self, *initial_data, soa=False, **kwargs):
         # def_attributes = ['time', 'acc', 'gyr', 'mag', 'q_ref', 'pos']
         # for a in def_attributes:
         #     setattr(self, a, None)
@@ -340,8 +481,27 @@ class Data:
                 setattr(self, key, dictionary[key])
         for key in kwargs:
             setattr(self, key, kwargs[key])
+        for key in self.sensor_fields:
+            if isinstance(getattr(self, key, None), np.ndarray):
+                setattr(self, key, getattr(self, key).astype(np.float32, copy=False))
+        if soa:
+            self.soa = True
+            for key in ('acc', 'gyr', 'mag'):
+                setattr(self, key, getattr(self, key))
         self.num_samples = len(self.acc) if self.acc is not None else 0
 
+    def normalize_quats(self):
+        """Normalize all reference quaternions at once.
+
+        Null quaternions are left as they are.
+        """
+        if self.q_ref is None:
+            return
+        Q = self.q_ref
+        q_norm = np.sqrt(np.einsum('ij,ij->i', Q, Q))
+        q_inv = np.reciprocal(q_norm, out=np.zeros_like(q_norm), where=q_norm!=0)
+        self.q_ref = Q*q_inv[:, None]
+
     def show_items(self):
         for k in self.__dict__.keys():
             print("{}".format(k))
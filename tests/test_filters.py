@@ -19,6 +19,7 @@ References
 """
 
 import numpy as np
+import pytest
 import ahrs
 
 RAD2DEG = ahrs.common.RAD2DEG
@@ -68,3 +69,152 @@ class Test_Filter:
             # self.Q[t] = madgwick.updateIMU(DEG2RAD*self.data.gyr[t], self.data.acc[t], self.Q[t-1])
             self.Q[t] = madgwick.updateMARG(DEG2RAD*self.data.gyr[t], self.data.acc[t], self.data.mag[t], self.Q[t-1])
         return self.check_integrity(self.Q)
+
+def _random_imu(num_samples=500, seed=0):
+    """Synthetic gyroscope, accelerometer and magnetometer samples"""
+    rng = np.random.default_rng(seed)
+    gyr = rng.normal(0.0, 0.3, (num_samples, 3))
+    acc = rng.normal(0.0, 0.5, (num_samples, 3)) + [0.0, 0.0, 9.81]
+    mag = rng.normal(0.0, 2.0, (num_samples, 3)) + [20.0, 0.0, -40.0]
+    return gyr, acc, mag
+
+def _madgwick_reference(q, gyr, acc, mag=None, gain=0.033, dt=0.01):
+    """Original step of Madgwick's filter, computed with the full Jacobian"""
+    from ahrs.common.orientation import q_prod, q_conj
+    if gyr is None or not np.linalg.norm(gyr)>0:
+        return q.copy()
+    if mag is not None and not np.linalg.norm(mag)>0:
+        mag = None
+    qDot = 0.5 * q_prod(q, [0, *gyr])
+    a_norm = np.linalg.norm(acc)
+    if a_norm>0:
+        a = acc/a_norm
+        qw, qx, qy, qz = q/np.linalg.norm(q)
+        f = [2.0*(qx*qz - qw*qy)   - a[0],
+             2.0*(qw*qx + qy*qz)   - a[1],
+             2.0*(0.5-qx**2-qy**2) - a[2]]
+        J = [[-2.0*qy,  2.0*qz, -2.0*qw, 2.0*qx],
+             [ 2.0*qx,  2.0*qw,  2.0*qz, 2.0*qy],
+             [ 0.0,    -4.0*qx, -4.0*qy, 0.0   ]]
+        if mag is not None:
+            m = mag/np.linalg.norm(mag)
+            h = q_prod(q, q_prod([0, *m], q_conj(q)))
+            bx = np.linalg.norm([h[1], h[2]])
+            bz = h[3]
+            f += [2.0*bx*(0.5 - qy**2 - qz**2) + 2.0*bz*(qx*qz - qw*qy)       - m[0],
+                  2.0*bx*(qx*qy - qw*qz)       + 2.0*bz*(qw*qx + qy*qz)       - m[1],
+                  2.0*bx*(qw*qy + qx*qz)       + 2.0*bz*(0.5 - qx**2 - qy**2) - m[2]]
+            J += [[-2.0*bz*qy,            2.0*bz*qz,           -4.0*bx*qy-2.0*bz*qw, -4.0*bx*qz+2.0*bz*qx],
+                  [-2.0*bx*qz+2.0*bz*qx,  2.0*bx*qy+2.0*bz*qw,  2.0*bx*qx+2.0*bz*qz, -2.0*bx*qw+2.0*bz*qy],
+                  [ 2.0*bx*qy,            2.0*bx*qz-4.0*bz*qx,  2.0*bx*qw-4.0*bz*qy,  2.0*bx*qx          ]]
+        gradient = np.array(J).T@np.array(f)
+        qDot = qDot - gain*gradient/np.linalg.norm(gradient)
+    q = q + qDot*dt
+    return q/np.linalg.norm(q)
+
+def test_madgwick_reference():
+    """Per-sample and batched estimations match the original computation"""
+    gyr, acc, mag = _random_imu()
+    gyr[10] = 0.0
+    acc[20] = 0.0
+    mag[30] = 0.0
+    madgwick = ahrs.filters.Madgwick()
+    marg = ahrs.filters.Madgwick(gain=0.041)
+    Q_imu = np.tile([1.0, 0.0, 0.0, 0.0], (len(gyr), 1))
+    Q_marg = Q_imu.copy()
+    for t in range(1, len(gyr)):
+        Q_imu[t] = _madgwick_reference(Q_imu[t-1], gyr[t], acc[t], gain=madgwick.gain, dt=madgwick.Dt)
+        Q_marg[t] = _madgwick_reference(Q_marg[t-1], gyr[t], acc[t], mag[t], gain=marg.gain, dt=marg.Dt)
+    assert np.allclose(madgwick.updateIMU_batch(gyr, acc, Q_imu[0]), Q_imu)
+    for t in range(1, len(gyr)):
+        assert np.allclose(madgwick.updateIMU(Q_imu[t-1].copy(), gyr[t], acc[t]), Q_imu[t])
+        assert np.allclose(marg.updateMARG(Q_marg[t-1].copy(), gyr[t], acc[t], mag[t]), Q_marg[t])
+
+def test_madgwick_inputs_unmodified():
+    """The a-priori quaternion and the samples are not modified"""
+    gyr, acc, mag = _random_imu(2)
+    q = np.array([2.0, 0.0, 0.0, 0.0])
+    inputs = (q, gyr[1], acc[1], mag[1])
+    copies = [x.copy() for x in inputs]
+    madgwick = ahrs.filters.Madgwick()
+    madgwick.updateIMU(q, gyr[1], acc[1])
+    madgwick.updateMARG(q, gyr[1], acc[1], mag[1])
+    for x, x_copy in zip(inputs, copies):
+        assert np.array_equal(x, x_copy)
+
+def test_madgwick_sweep():
+    """Sweeping several gains matches one batch estimation per gain"""
+    gyr, acc, _ = _random_imu(200)
+    gains = [0.01, 0.033, 0.1]
+    madgwick = ahrs.filters.Madgwick()
+    Q = madgwick.sweep(np.tile(gyr, (3, 1, 1)), np.tile(acc, (3, 1, 1)), gain=gains)
+    assert Q.shape == (3, 200, 4)
+    for Q_gain, gain in zip(Q, gains):
+        assert np.allclose(Q_gain, ahrs.filters.Madgwick(gain=gain).updateIMU_batch(gyr, acc))
+
+def test_madgwick_stream():
+    """Stream estimation with prepare/stepIMU matches the batch estimation"""
+    gyr, acc, _ = _random_imu(200)
+    madgwick = ahrs.filters.Madgwick()
+    q0 = madgwick.updateIMU_batch(gyr, acc)[0]
+    Q = madgwick.prepare(len(gyr), q0)
+    assert Q is madgwick.Q and Q.shape == (200, 4)
+    for t in range(1, len(gyr)):
+        q = madgwick.stepIMU(t, gyr[t], acc[t])
+        assert np.shares_memory(q, Q)
+    assert np.allclose(Q, madgwick.updateIMU_batch(gyr, acc, q0))
+
+def test_madgwick_time_step():
+    """A time step given per sample overrides the attribute Dt"""
+    gyr, acc, mag = _random_imu(2)
+    q = np.array([1.0, 0.0, 0.0, 0.0])
+    madgwick = ahrs.filters.Madgwick()
+    slower = ahrs.filters.Madgwick(Dt=0.05)
+    assert np.allclose(madgwick.updateIMU(q, gyr[1], acc[1], dt=0.05), slower.updateIMU(q, gyr[1], acc[1]))
+    assert np.allclose(madgwick.updateMARG(q, gyr[1], acc[1], mag[1], dt=0.05), slower.updateMARG(q, gyr[1], acc[1], mag[1]))
+    madgwick.prepare(2)
+    assert np.allclose(madgwick.stepIMU(1, gyr[1], acc[1], dt=0.05), slower.updateIMU(q, gyr[1], acc[1]))
+    assert not np.allclose(madgwick.updateIMU(q, gyr[1], acc[1]), slower.updateIMU(q, gyr[1], acc[1]))
+
+def test_madgwick_invalid_samples():
+    """Null or non-finite samples must not corrupt the estimation"""
+    gyr, acc, mag = _random_imu()
+    q = np.array([1.0, 0.0, 0.0, 0.0])
+    madgwick = ahrs.filters.Madgwick()
+    assert np.allclose(madgwick.updateIMU(q, gyr[1], [np.nan]*3), madgwick.updateIMU(q, gyr[1], [0.0]*3))
+    assert np.allclose(madgwick.updateIMU(q, gyr[1], [np.inf, 0.0, 0.0]), madgwick.updateIMU(q, gyr[1], [0.0]*3))
+    assert np.allclose(madgwick.updateIMU(q, [np.nan, 0.0, 0.0], acc[1]), q)
+    assert np.allclose(madgwick.updateIMU(q, [0.0, 0.0, 0.0], acc[1]), q)
+    assert np.all(np.isfinite(madgwick.updateMARG(q, gyr[1], [np.nan]*3, mag[1])))
+    assert np.allclose(madgwick.updateMARG(q, gyr[1], acc[1], [np.nan]*3), madgwick.updateIMU(q, gyr[1], acc[1]))
+    acc[50] = np.nan
+    acc[60] = [np.inf, 0.0, 0.0]
+    gyr[70] = np.nan
+    gyr[80] = 0.0
+    Q = madgwick.updateIMU_batch(gyr, acc, q)
+    assert np.all(np.isfinite(Q))
+    assert np.allclose(Q[70], Q[69]) and np.allclose(Q[80], Q[79])
+
+def test_madgwick_sweep_invalid_samples():
+    """Sweep skips the same null and non-finite samples as updateIMU_batch"""
+    gyr, acc, _ = _random_imu(200)
+    gyr[[10, 50]] = 0.0
+    gyr[[20, 60], 1] = np.nan
+    acc[[30, 50]] = 0.0
+    acc[[40, 60], 2] = np.inf
+    madgwick = ahrs.filters.Madgwick()
+    Q_batch = madgwick.updateIMU_batch(gyr, acc)
+    Q_sweep = madgwick.sweep(np.stack((gyr, gyr)), np.stack((acc, acc)))
+    assert np.all(np.isfinite(Q_sweep))
+    assert np.allclose(Q_sweep[0], Q_batch) and np.allclose(Q_sweep[1], Q_batch)
+
+def test_madgwick_stream_index():
+    """Streamed samples must fall within the prepared quaternions"""
+    gyr, acc, _ = _random_imu(10)
+    madgwick = ahrs.filters.Madgwick()
+    with pytest.raises(ValueError):
+        madgwick.stepIMU(1, gyr[1], acc[1])
+    madgwick.prepare(len(gyr))
+    for t in (0, -1, len(gyr)):
+        with pytest.raises(ValueError):
+            madgwick.stepIMU(t, gyr[1], acc[1])
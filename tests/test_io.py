@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+Test data input and output
+==========================
+
+"""
+
+import os
+import numpy as np
+import pytest
+import ahrs.utils.io
+
+def test_load_cached(tmp_path, monkeypatch):
+    """Text data is parsed once and then memory-mapped from its cache"""
+    file_name = str(tmp_path / 'imu.txt')
+    data = np.random.random((20, 7))
+    data[:, 0] = 1.4e9 + np.arange(20)*1e-3     # Timestamps need double precision
+    np.savetxt(file_name, data, delimiter=' ')
+    # A failed write leaves no cache behind
+    def failed_save(*args, **kwargs):
+        raise OSError("No space left on device")
+    with monkeypatch.context() as m:
+        m.setattr(np, 'save', failed_save)
+        times, values = ahrs.utils.io.load_cached(file_name)
+    assert os.listdir(tmp_path) == ['imu.txt']
+    assert np.array_equal(times, data[:, 0])
+    assert np.allclose(values, data[:, 1:])
+    ahrs.utils.io.load_cached(file_name)
+    assert sorted(os.listdir(tmp_path)) == ['imu.npy', 'imu.txt', 'imu_time.npy']
+    times, values = ahrs.utils.io.load_cached(file_name)
+    assert isinstance(times, np.memmap) and isinstance(values, np.memmap)
+    assert times.dtype == np.float64 and values.dtype == np.float32
+    assert np.array_equal(times, data[:, 0])
+    assert np.allclose(values, data[:, 1:])
+    # Data keeps the memory-mapped single precision columns without copying
+    d = ahrs.utils.io.Data(acc=values[:, 0:3], time=times)
+    assert np.shares_memory(d.acc, values)
+
+def test_data_float32():
+    """Sensor arrays are stored in single precision, timestamps are not"""
+    time = 1.4e9 + np.arange(10)*1e-3
+    acc = np.random.random((10, 3))
+    data = ahrs.utils.io.Data(time=time, acc=acc, q_ref=np.random.random((10, 4)))
+    assert data.acc.dtype == np.float32 and data.q_ref.dtype == np.float32
+    assert data.time is time
+    assert np.allclose(data.acc, acc)
+    single = acc.astype(np.float32)
+    assert ahrs.utils.io.Data(acc=single).acc is single
+    # Also when set after construction
+    data.gyr = np.random.random((10, 3))
+    data.acc = acc
+    assert data.gyr.dtype == np.float32 and data.acc.dtype == np.float32
+    soa = ahrs.utils.io.Data(soa=True)
+    soa.mag = np.random.random((10, 3))
+    assert soa.mag.dtype == np.float32 and soa.mag_x.flags['C_CONTIGUOUS']
+
+def test_data_normalize_quats():
+    """Reference quaternions become unit quaternions, except null ones"""
+    Q = np.array([[2.0, 0.0, 0.0, 0.0], [1.0, 1.0, 1.0, 1.0], [0.0, 0.0, 0.0, 0.0]])
+    data = ahrs.utils.io.Data(q_ref=Q.copy())
+    data.normalize_quats()
+    assert np.allclose(data.q_ref, [[1.0, 0.0, 0.0, 0.0], [0.5, 0.5, 0.5, 0.5], [0.0, 0.0, 0.0, 0.0]])
+    empty = ahrs.utils.io.Data()
+    empty.normalize_quats()
+    assert empty.q_ref is None
+
+def test_data_soa():
+    """Column-wise storage of sensor arrays is transparent to its users"""
+    acc = np.random.random((100, 3))
+    gyr = np.random.random((100, 3))
+    data = ahrs.utils.io.Data(acc=acc, gyr=gyr, soa=True)
+    assert data.num_samples == 100 and data.mag is None
+    assert np.allclose(data.acc, acc) and np.allclose(data.gyr, gyr)
+    assert data.acc_x.flags['C_CONTIGUOUS'] and data.gyr_z.flags['C_CONTIGUOUS']
+    assert np.allclose(data.acc_y, acc[:, 1])
+    assert np.shares_memory(data.acc, data.acc_x)
+    data.acc[0, 0] = 123.0
+    data.acc[:, 2] *= -1.0
+    assert data.acc_x[0] == 123.0
+    assert np.allclose(data.acc_z, -acc[:, 2])
+    assert np.allclose(data.acc[:, 2], -acc[:, 2])
+    aos = ahrs.utils.io.Data(acc=acc)
+    assert np.allclose(aos.acc_y, acc[:, 1]) and aos.gyr_x is None
+
+def test_find_index():
+    """Columns are found by a tag contained in their header"""
+    header = ['time', 'acc_x', 'acc_y', 'acc_z', 'gyr_x', 'gyr_y', 'gyr_z', 'orientation_w']
+    assert ahrs.utils.io.find_index(header, 'acc') == 1
+    assert ahrs.utils.io.find_index(header, 'gyr') == 4
+    assert ahrs.utils.io.find_index(header, 'orient') == 7
+    assert ahrs.utils.io.find_index(header, 'mag') is None
+
+def test_list_files(tmp_path):
+    """Only files with the requested extension are listed"""
+    for name in ('imu.txt', 'calib.txt', 'notes.csv'):
+        (tmp_path / name).write_text('0\n')
+    (tmp_path / 'images.txt').mkdir()
+    assert ahrs.utils.io.list_files(tmp_path) == {'imu.txt', 'calib.txt'}
+    assert ahrs.utils.io.list_files(str(tmp_path), '.csv') == {'notes.csv'}
+    with pytest.raises(OSError):
+        ahrs.utils.io.list_files(tmp_path / 'missing')
+
+def test_load_cached_unreadable(tmp_path):
+    """A cache that cannot be read is ignored and the text file is parsed"""
+    file_name = str(tmp_path / 'imu.txt')
+    data = np.random.random((20, 7))
+    np.savetxt(file_name, data, delimiter=' ')
+    ahrs.utils.io.load_cached(file_name)
+    # Caches are readable by others, like any other new file
+    umask = os.umask(0)
+    os.umask(umask)
+    for cache_name in ('imu.npy', 'imu_time.npy'):
+        assert os.stat(tmp_path / cache_name).st_mode & 0o777 == 0o666 & ~umask
+    (tmp_path / 'imu.npy').write_bytes(b'\x93NUMPY')     # Truncated cache
+    times, values = ahrs.utils.io.load_cached(file_name)
+    assert np.array_equal(times, data[:, 0])
+    assert np.allclose(values, data[:, 1:])
@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+"""
+Test orientation functions
+==========================
+
+"""
+
+import numpy as np
+from ahrs.common.orientation import q_prod
+
+def test_q_prod():
+    """Hamilton product of quaternions"""
+    p = np.array([0.5, -0.1, 0.3, 0.8])
+    q = np.array([-0.2, 0.7, 0.4, -0.6])
+    pw, px, py, pz = p
+    qw, qx, qy, qz = q
+    pq = [pw*qw - px*qx - py*qy - pz*qz,
+          pw*qx + px*qw + py*qz - pz*qy,
+          pw*qy - px*qz + py*qw + pz*qx,
+          pw*qz + px*qy - py*qx + pz*qw]
+    assert np.allclose(q_prod(p, q), pq)
+    assert np.allclose(q_prod(list(p), [1.0, 0.0, 0.0, 0.0]), p)
+    assert np.allclose(q_prod([0.0, 1.0, 0.0, 0.0], [0.0, 0.0, 1.0, 0.0]), [0.0, 0.0, 0.0, 1.0])